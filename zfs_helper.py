@@ -13,6 +13,13 @@ from subprocess import Popen, PIPE
 from json import loads
 from re import match
 from apt import Cache
+from os import makedirs, path, replace, write
+from sqlite3 import connect, Error as DbError
+from time import time, strftime, localtime
+from collections import deque
+from threading import Thread, Lock
+from queue import Queue, Empty
+from shlex import quote
 
 class CascadingBoxes(urwid.WidgetPlaceholder):
     """
@@ -47,6 +54,166 @@ class CascadingBoxes(urwid.WidgetPlaceholder):
 
 
 
+class LogWalker(urwid.ListWalker):
+    """
+    Log panel content. Keeps plain (timestamp, level, message) records in a ring
+    buffer, newest first, and builds urwid.Text only for lines ListBox asks for.
+    """
+    levels = ['debug', 'info', 'warn', 'error']
+    widget_cache = 256                                  # max cached line widgets
+
+    def __init__(self, capacity=1000):
+        """
+        :capacity: int - how many records are kept
+        """
+        self.records = deque(maxlen=capacity)
+        self._view = deque()                            # records matching filter, newest first
+        self._widgets = {}
+        self.min_level = 'debug'
+        self.search = ''
+        self.focus = 0
+
+    def match(self, record):
+        """
+        Checks record against level filter and search string
+        :record: tuple(ts, level, msg)
+        :return: bool
+        """
+        if self.levels.index(record[1]) < self.levels.index(self.min_level):
+            return False
+        return self.search.lower() in record[2].lower()
+
+    def append(self, record):
+        """
+        Adds record to buffer, oldest one is dropped if buffer is full
+        :record: tuple(ts, level, msg)
+        """
+        if len(self.records) == self.records.maxlen and self._view and self._view[-1] is self.records[0]:
+            self._view.pop()
+        self.records.append(record)
+        if self.match(record):
+            self._view.appendleft(record)
+            if self.focus:
+                self.focus += 1                         # keep position of user scrolling back
+        self._modified()
+
+    def set_filter(self, min_level=None, search=None):
+        """
+        Rebuilds visible records. Only tuples are touched, no widgets created.
+        :min_level: str - one of levels
+        :search: str - case insensitive substring
+        """
+        if min_level is not None:
+            self.min_level = min_level
+        if search is not None:
+            self.search = search
+        self._view = deque(x for x in reversed(self.records) if self.match(x))
+        self.focus = 0
+        self._modified()
+
+    def _widget(self, position):
+        record = self._view[position]
+        w = self._widgets.get(record)
+        if w is None:
+            if len(self._widgets) >= self.widget_cache:
+                self._widgets.clear()
+            w = urwid.Text(' '.join([strftime('%H:%M:%S', localtime(record[0])), record[1][0].upper(), record[2]]))
+            self._widgets[record] = w
+        return w
+
+    # [ LISTWALKER INTERFACE ]
+    def get_focus(self):
+        if not self._view:
+            return None, None
+        self.focus = min(self.focus, len(self._view) - 1)
+        return self._widget(self.focus), self.focus
+
+    def set_focus(self, position):
+        self.focus = position
+        self._modified()
+
+    def get_next(self, position):
+        if position + 1 >= len(self._view):
+            return None, None
+        return self._widget(position + 1), position + 1
+
+    def get_prev(self, position):
+        if position < 1:
+            return None, None
+        return self._widget(position - 1), position - 1
+
+
+class LogWriter(object):
+    """
+    Appends log records to a file from background thread. Records queued while
+    the file is written are flushed in one batch. File is rotated by size.
+    First write failure is kept in error, so GUI can report it.
+    """
+    log_path = '/var/log/zfs_helper.log'
+    max_bytes = 1024 * 1024
+    backup_count = 3
+
+    def __init__(self, log_path=None):
+        """
+        :log_path: str
+        """
+        if log_path:
+            self.log_path = log_path
+        self.error = None
+        self._queue = Queue()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, record):
+        """
+        :record: tuple(ts, level, msg)
+        """
+        self._queue.put(record)
+
+    def close(self):
+        """
+        Flushes pending records and stops writer thread
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            try:
+                while True:
+                    batch.append(self._queue.get_nowait())
+            except Empty:
+                pass
+            if None in batch:
+                running = False
+                batch = [x for x in batch if x is not None]
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        lines = ''.join(
+            '{} {:5s} {}\n'.format(strftime('%Y-%m-%d %H:%M:%S', localtime(ts)), level, msg)
+            for ts, level, msg in batch
+        )
+        try:
+            if path.exists(self.log_path) and path.getsize(self.log_path) >= self.max_bytes:
+                self._rotate()
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+        except OSError as e:
+            if self.error is None:
+                self.error = e
+
+    def _rotate(self):
+        for n in range(self.backup_count - 1, 0, -1):
+            src = '{}.{}'.format(self.log_path, n)
+            if path.exists(src):
+                replace(src, '{}.{}'.format(self.log_path, n + 1))
+        replace(self.log_path, self.log_path + '.1')
+
+
 class ZfsRequires (object):
     """
     Class manages installing additional packages
@@ -177,6 +344,7 @@ class ZfsDrive (object):
 
     def __init__(self):
         self.zpool = '/sbin/zpool'
+        self.zfs = '/sbin/zfs'
     
     def name_validator(self, name, type='fs'):
         """
@@ -314,6 +482,84 @@ class ZfsDrive (object):
         
         return ret
 
+    def list_usage(self):
+        """
+        Returns exact usage in bytes of pools and datasets, used by history sampler
+        :return: list[tuple(kind, name, used, avail, frag)]
+        """
+        ret = []
+        pools = self.load_runner([self.zpool, 'list', '-Hp', '-o', 'name,alloc,free,frag'])[0]
+        for line in pools.splitlines():
+            fields = line.split('\t')
+            if len(fields) != 4 or not fields[1].isdigit():
+                continue
+            frag = fields[3].rstrip('%')
+            ret.append(('pool', fields[0], int(fields[1]), int(fields[2]), int(frag) if frag.isdigit() else None))
+
+        datasets = self.load_runner([self.zfs, 'list', '-Hp', '-t', 'filesystem,volume', '-o', 'name,used,avail'])[0]
+        for line in datasets.splitlines():
+            fields = line.split('\t')
+            if len(fields) != 3 or not fields[1].isdigit():
+                continue
+            ret.append(('fs', fields[0], int(fields[1]), int(fields[2]), None))
+
+        return ret
+
+    def list_space(self, pool):
+        """
+        Returns space accounting of all datasets in pool, parents before children
+        :pool: str
+        :return: list[tuple(name, used, usedbydataset, usedbysnapshots, usedbychildren, usedbyrefreservation, compressratio)]
+        """
+        cmd = [self.zfs, 'list', '-Hp', '-r', '-t', 'filesystem,volume', '-o',
+            'name,used,usedbydataset,usedbysnapshots,usedbychildren,usedbyrefreservation,compressratio', quote(pool)]
+        ret = []
+        for line in self.load_runner(cmd)[0].splitlines():
+            fields = line.split('\t')
+            if len(fields) != 7 or not fields[1].isdigit():
+                continue
+            sizes = tuple(int(x) if x.isdigit() else 0 for x in fields[1:6])
+            try:
+                ratio = float(fields[6].rstrip('x'))
+            except ValueError:
+                ratio = 1.0
+            ret.append((fields[0],) + sizes + (ratio,))
+
+        return ret
+
+    def list_snapshots(self, dataset):
+        """
+        Returns snapshots of dataset, oldest first
+        :dataset: str
+        :return: list[tuple(snapshot name without dataset, used)]
+        """
+        cmd = [self.zfs, 'list', '-Hp', '-t', 'snapshot', '-d', '1', '-s', 'createtxg', '-o', 'name,used', quote(dataset)]
+        ret = []
+        for line in self.load_runner(cmd)[0].splitlines():
+            fields = line.split('\t')
+            if len(fields) != 2 or '@' not in fields[0]:
+                continue
+            ret.append((fields[0].split('@', 1)[1], int(fields[1]) if fields[1].isdigit() else 0))
+
+        return ret
+
+    def snapshot_reclaim(self, dataset, first, last):
+        """
+        Dry run of destroying range of snapshots, syntax:
+        zfs destroy -nvp dataset@first%last
+        :dataset: str
+        :first: str - oldest snapshot of range
+        :last: str - newest snapshot of range
+        :return: int(bytes) or None if zfs did not report it
+        """
+        snap_range = ''.join([dataset, '@', first, '%', last])
+        for line in self.load_runner([self.zfs, 'destroy', '-nvp', quote(snap_range)])[0].splitlines():
+            fields = line.split('\t')
+            if fields[0] == 'reclaim' and fields[-1].isdigit():
+                return int(fields[-1])
+
+        return None
+
 
     def impex_pool(self, name, type='import', force=False):
         """
@@ -352,6 +598,222 @@ class ZfsDrive (object):
         self.fs_options = options
 
 
+class ZfsHistory (object):
+    """
+    Time-series store of pool/dataset usage. Raw samples are appended to sqlite
+    and folded into hourly and daily rollups on the same write. Old rows are
+    pruned at startup and then once per prune_interval.
+    Safe to use from sampler thread and UI thread at once.
+    """
+    db_path = '/var/lib/zfs_helper/history.db'
+    raw_keep = 7 * 86400                                # raw samples older than this are pruned
+    rollups = [ ('hourly', 3600, 90 * 86400), ('daily', 86400, None) ]     # table, bucket, retention
+    prune_interval = 86400
+    forecast_span = 30 * 86400                          # how far back fill-date forecast looks
+    forecast_min_span = 2 * 86400                       # shorter history gives no forecast
+    forecast_horizon = 10 * 365 * 86400                 # fill dates further away are not shown
+
+    def __init__(self, db_path=None):
+        """
+        :db_path: str - sqlite file, created if missing
+        """
+        if db_path:
+            self.db_path = db_path
+        db_dir = path.dirname(self.db_path)
+        if db_dir:
+            makedirs(db_dir, exist_ok=True)
+
+        self._lock = Lock()
+        self._db = connect(self.db_path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        with self._db:
+            # Raw samples are keyed by time, so writes and pruning only touch the end/start of table
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS samples (kind TEXT, name TEXT, ts INTEGER, n INTEGER, '
+                'used INTEGER, avail INTEGER, frag INTEGER, frag_n INTEGER, '
+                'PRIMARY KEY (ts, kind, name)) WITHOUT ROWID'
+            )
+            for table in [x[0] for x in self.rollups]:
+                # Rollups keep sums and sample counts, averages are computed on read.
+                # frag has own count, datasets and some pools do not report it.
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS {} (kind TEXT, name TEXT, ts INTEGER, n INTEGER, '
+                    'used INTEGER, avail INTEGER, frag INTEGER, frag_n INTEGER, '
+                    'PRIMARY KEY (kind, name, ts)) WITHOUT ROWID'.format(table)
+                )
+                self._db.execute('CREATE INDEX IF NOT EXISTS {0}_ts ON {0} (ts)'.format(table))
+        self.prune()
+
+    def prune(self, now=None):
+        """
+        Drops raw samples and rollups older than their retention
+        :now: int - unix time, now if omitted
+        """
+        now = int(now or time())
+        with self._lock, self._db:
+            for table, step, keep in self.rollups:
+                if keep:
+                    self._db.execute('DELETE FROM {} WHERE ts < ?'.format(table), (now - keep,))
+            self._db.execute('DELETE FROM samples WHERE ts < ?', (now - self.raw_keep,))
+        self._pruned = now
+
+    def append(self, usage, ts=None):
+        """
+        Stores one sample per pool/dataset in a single transaction.
+        Pools/datasets already sampled at the same second are skipped.
+        :usage: list[tuple(kind, name, used, avail, frag)] as from ZfsDrive.list_usage
+        :ts: int - unix time of sample, now if omitted
+        """
+        if not usage:
+            return
+        ts = int(ts or time())
+
+        with self._lock, self._db:
+            sampled = set(self._db.execute('SELECT kind, name FROM samples WHERE ts = ?', (ts,)))
+            rows = [
+                (kind, name, ts, used, avail, frag, 0 if frag is None else 1)
+                for kind, name, used, avail, frag in usage if (kind, name) not in sampled
+            ]
+            if not rows:
+                return
+
+            self._db.executemany('INSERT INTO samples VALUES (?, ?, ?, 1, ?, ?, ?, ?)', rows)
+            for table, step, _ in self.rollups:
+                bucket = ts - ts % step
+                self._db.executemany(
+                    'INSERT INTO {} VALUES (?, ?, ?, 1, ?, ?, ?, ?) '
+                    'ON CONFLICT (kind, name, ts) DO UPDATE SET n = n + 1, '
+                    'used = used + excluded.used, avail = avail + excluded.avail, '
+                    'frag = coalesce(frag + excluded.frag, frag, excluded.frag), '
+                    'frag_n = frag_n + excluded.frag_n'.format(table),
+                    [(kind, name, bucket, used, avail, frag, frag_n) for kind, name, _, used, avail, frag, frag_n in rows]
+                )
+
+        if ts - self._pruned >= self.prune_interval:
+            self.prune(ts)
+
+    def history(self, name, kind='pool', since=0, table='hourly'):
+        """
+        Reads averaged usage of one pool/dataset. Rollups are indexed by name,
+        raw samples are kept in time order and get scanned. A year of daily
+        rollups is ~0.4ms per dataset, bound by sqlite3 row conversion.
+        :name: str
+        :kind: str - 'pool' or 'fs'
+        :since: int - unix time of oldest point
+        :table: str - 'samples', 'hourly' or 'daily'
+        :return: list[tuple(ts, used, avail, frag)]
+        """
+        if table not in ['samples'] + [x[0] for x in self.rollups]:
+            return []
+        with self._lock:
+            return self._db.execute(
+                'SELECT ts, used / n, avail / n, frag / frag_n FROM {} '
+                'WHERE kind = ? AND name = ? AND ts >= ? ORDER BY ts'.format(table),
+                (kind, name, since)
+            ).fetchall()
+
+    def forecast(self, name, kind='pool', now=None):
+        """
+        Estimates when pool/dataset gets full, by least squares fit of used space
+        over last forecast_span
+        :return: int(unix time) or None if usage is not growing, history is too short
+            or pool gets full beyond forecast_horizon
+        """
+        now = int(now or time())
+        points = self.history(name, kind, now - self.forecast_span, 'hourly')
+        if len(points) < 2 or points[-1][0] - points[0][0] < self.forecast_min_span:
+            return None
+
+        n = len(points)
+        t0 = points[0][0]
+        mean_t = sum(p[0] - t0 for p in points) / n
+        mean_u = sum(p[1] for p in points) / n
+        var_t = sum((p[0] - t0 - mean_t) ** 2 for p in points)
+        if not var_t:
+            return None
+        slope = sum((p[0] - t0 - mean_t) * (p[1] - mean_u) for p in points) / var_t
+        if slope <= 0:
+            return None
+
+        capacity = points[-1][1] + points[-1][2]
+        full_at = t0 + mean_t + (capacity - mean_u) / slope
+        if full_at < now or full_at > now + self.forecast_horizon:
+            return None
+        return int(full_at)
+
+
+class ZfsSpaceTree (object):
+    """
+    Space accounting tree of one pool. Loaded from single 'zfs list' stream,
+    aggregated bottom-up, on refresh only changed subtrees are recomputed.
+    """
+    def __init__(self, pool):
+        """
+        :pool: str
+        """
+        self.pool = pool
+        self.nodes = {}
+
+    def load(self, rows):
+        """
+        Builds tree on first call, updates changed nodes and their ancestors later on
+        :rows: list[tuple] as from ZfsDrive.list_space
+        :return: set of recomputed dataset names
+        """
+        seen = set()
+        dirty = set()
+        for row in rows:
+            name = row[0]
+            props = row[1:]
+            seen.add(name)
+            node = self.nodes.get(name)
+            if node is None:
+                parent = name.rpartition('/')[0] or None
+                self.nodes[name] = {
+                    'name': name, 'parent': parent, 'children': [], 'props': props,
+                    'snap_total': 0, 'count': 0
+                }
+                if parent in self.nodes:
+                    self.nodes[parent]['children'].append(name)
+                dirty.add(name)
+            elif node['props'] != props:
+                node['props'] = props
+                dirty.add(name)
+
+        for name in [x for x in self.nodes if x not in seen]:
+            parent = self.nodes[name]['parent']
+            if parent in self.nodes:
+                self.nodes[parent]['children'].remove(name)
+                dirty.add(parent)
+            del self.nodes[name]
+
+        stale = set()
+        for name in dirty:
+            while name in self.nodes and name not in stale:
+                stale.add(name)
+                name = self.nodes[name]['parent']
+
+        # Deepest first, so children are always done before parent
+        for name in sorted(stale, key=lambda x: x.count('/'), reverse=True):
+            node = self.nodes[name]
+            node['children'].sort(key=lambda x: self.nodes[x]['props'][0], reverse=True)
+            children = [self.nodes[x] for x in node['children']]
+            node['snap_total'] = node['props'][2] + sum(x['snap_total'] for x in children)
+            node['count'] = 1 + sum(x['count'] for x in children)
+
+        return stale
+
+    def children(self, name):
+        """
+        :name: str - dataset
+        :return: list[dict] - child nodes, biggest first
+        """
+        if name not in self.nodes:
+            return []
+        return [self.nodes[x] for x in self.nodes[name]['children']]
+
+
 class ZfsGuiModel (object):
     """
     Data model class. Aims to lighten GUI class.
@@ -410,12 +872,15 @@ class ZfsGuiModel (object):
                 size_n_free_n_frag  = '{:5s} {:5s} {:4s}'.format(this_pool['size'], this_pool['free'], this_pool['frag'],)
                 status              = this_pool['status']
                 alt_root            = this_pool['altroot']
+                fill_date           = self.caller_self.fill_date(zpool_name)
 
-                button_text         = ' '.join([size_n_free_n_frag, status, '\n', alt_root])
+                button_text         = ' '.join([size_n_free_n_frag, status, '\n', alt_root, 'Full:', fill_date])
 
                 button_widget = self.caller_self.button(button_text, self.caller_self.btn_edit_zpool, zpool_name, zpool_name)
-                
+                space_widget = self.caller_self.button('Space usage...', self.caller_self.btn_space_dataset, False, zpool_name)
+
                 zpool_list.append(button_widget)
+                zpool_list.append(urwid.Padding(space_widget, left=2, right=1))
                 del zpool_name
 
             del zpool_list_raw
@@ -424,6 +889,74 @@ class ZfsGuiModel (object):
 
         return zpool_list
 
+    def human_size(self, size):
+        """
+        Formats bytes like zfs does
+        :size: int
+        :return: str
+        """
+        for unit in ['B', 'K', 'M', 'G', 'T', 'P']:
+            if size < 1024:
+                break
+            size /= 1024
+        return '{:.1f}{}'.format(size, unit) if unit != 'B' else '{}B'.format(size)
+
+    def space_list(self, tree, name):
+        """
+        Prepares space breakdown of dataset and its children
+        :tree: ZfsSpaceTree
+        :name: str - dataset
+        :return: list[widgets]
+        """
+        # Plain rows are indented like urwid.Button labels, which get '< ' prefix
+        row_format = '{:>7s} {:>7s} {:>7s} {:>7s} {:>7s} {:>5s} {}'
+        space_list = [urwid.Text('  ' + row_format.format('Used', 'Data', 'Snaps', 'Child', 'Refres', 'Ratio', 'Name'))]
+
+        node = tree.nodes.get(name)
+        if not node:
+            space_list.append(urwid.Text(u'Dataset is gone'))
+            return space_list
+
+        for this_node in [node] + tree.children(name):
+            used, data, snaps, child, refres, ratio = this_node['props']
+            row_text = row_format.format(
+                self.human_size(used), self.human_size(data), self.human_size(snaps),
+                self.human_size(child), self.human_size(refres), '{:.2f}x'.format(ratio),
+                this_node['name'].rpartition('/')[2] if this_node is not node else '.'
+            )
+            if this_node is node:
+                space_list.append(urwid.Text('  ' + row_text))
+            else:
+                space_list.append(self.caller_self.button(row_text, self.caller_self.btn_space_dataset, False, this_node['name']))
+
+        space_list.append(self.caller_self.hd)
+        space_list.append(urwid.Text('Datasets in subtree: {}, snapshots in subtree: {}'.format(
+            node['count'], self.human_size(node['snap_total'])
+        )))
+        space_list.append(self.caller_self.button('Snapshots...', self.caller_self.btn_snapshots, False, name))
+
+        return space_list
+
+    def snapshot_list(self, dataset, snapshots):
+        """
+        Prepares snapshots of dataset for picking reclaim range
+        :dataset: str
+        :snapshots: list[tuple(name, used)] oldest first
+        :return: list[widgets]
+        """
+        if not snapshots:
+            return [urwid.Text(u'No snapshots')]
+
+        snapshot_list = [
+            urwid.Text(u'Press first and last snapshot of range to see what destroying it reclaims'),
+            urwid.Text('  {:>7s} {}'.format('Used', 'Snapshot'))
+        ]
+        for index, this_snap in enumerate(snapshots):
+            button_text = '{:>7s} {}'.format(self.human_size(this_snap[1]), this_snap[0])
+            snapshot_list.append(self.caller_self.button(button_text, self.caller_self.btn_snap_reclaim, False, (dataset, this_snap[0], index)))
+
+        return snapshot_list
+
     def button_menu(self):
         """
         Prepares list of widgets for menu. Mostly it's buttons
@@ -475,8 +1008,20 @@ class ZfsGui (object):
 
     def __init__(self):
         self.mothership_core = ZfsDrive()
-        self.log = []
+        self.log = LogWalker()
+        self.log_writer = LogWriter()
+        self._log_writer_reported = False
         self.handle = {}
+        self.space_trees = {}
+        self.snap_range = None
+        self.sample_interval = 300                      # seconds between usage samples
+        self._sampling = False
+        self._sample_error = None
+        try:
+            self.history = ZfsHistory()
+        except (DbError, OSError) as e:
+            self.history = None
+            self.log_it(u"Usage history disabled: {}".format(e), 'error')
 
         # All urwid staff happens in this function
         self._system_update = ZfsRequires()
@@ -485,7 +1030,7 @@ class ZfsGui (object):
             upd_msg = self._system_update.apt_update()
 
             for this_msg in upd_msg:
-                self.log.insert(0, urwid.Text(this_msg))
+                self.log_it(this_msg)
 
         self.init_window()
         
@@ -497,14 +1042,95 @@ class ZfsGui (object):
         Grab key, make action
         """
         if key == 'f5':
+            self.store_usage()
             self.frame_refresh(self.model.disk_list(self.mothership_core.list_disks()), 'dlist')
             self.frame_refresh(self.model.zfs_pools(self.mothership_core.list_zpools()), 'zlist')
 
+        if key == 'f6':
+            levels = self.log.levels
+            self.log.set_filter(min_level=levels[(levels.index(self.log.min_level) + 1) % len(levels)])
+            self.log_title.set_text(u'Log [{}+]'.format(self.log.min_level))
+
         if key == 'q' or key == 'й' or key == 'ქ':
             raise urwid.ExitMainLoop()
 
-    def log_it(self, log_msg):
-        self.panel_update(self.log_box, urwid.Text(log_msg))
+    def store_usage(self):
+        """
+        Starts usage sample in background thread, so zfs listing does not block input.
+        Sample is skipped if previous one is still running.
+        """
+        if not self.history or self._sampling:
+            return
+        self._sampling = True
+        Thread(target=self._sample_worker, daemon=True).start()
+
+    def _sample_worker(self):
+        self._sample_error = None
+        try:
+            self.history.append(self.mothership_core.list_usage())
+        except (DbError, OSError) as e:
+            self._sample_error = e
+        finally:
+            write(self._sample_pipe, b'.')             # wakes sample_done in urwid loop
+
+    def sample_done(self, data):
+        """
+        Called in urwid loop when background sample is finished
+        """
+        self._sampling = False
+        self.check_log_writer()
+        if self._sample_error:
+            self.log_it(u"Usage history not saved: {}".format(self._sample_error), 'error')
+            self._sample_error = None
+        return True
+
+    def sample_usage(self, loop=None, data=None):
+        """
+        Stores usage sample and schedules next one
+        """
+        try:
+            self.store_usage()
+        finally:
+            self._loop.set_alarm_in(self.sample_interval, self.sample_usage)
+
+    def fill_date(self, pool_name):
+        """
+        Forecasted date when pool gets full
+        :pool_name: str
+        :return: str
+        """
+        if not self.history:
+            return 'n/a'
+        try:
+            full_at = self.history.forecast(pool_name)
+            return strftime('%Y-%m-%d', localtime(full_at)) if full_at else 'n/a'
+        except (DbError, OverflowError, OSError, ValueError) as e:
+            self.log_it(u"Fill date of {} not forecasted: {}".format(pool_name, e), 'error')
+            return 'n/a'
+
+    def log_it(self, log_msg, level='info'):
+        """
+        Adds message to log panel and log file
+        :log_msg: str
+        :level: str - one of LogWalker.levels, unknown ones are logged as info
+        """
+        if level not in LogWalker.levels:
+            level = 'info'
+        record = (time(), level, str(log_msg))
+        self.log.append(record)
+        self.log_writer.put(record)
+        self.check_log_writer()
+
+    def check_log_writer(self):
+        """
+        Reports failed log file write once, in panel only
+        """
+        if self.log_writer.error and not self._log_writer_reported:
+            self._log_writer_reported = True
+            self.log.append((time(), 'error', u"Log file {} not written: {}".format(self.log_writer.log_path, self.log_writer.error)))
+
+    def log_search(self, widget, text):
+        self.log.set_filter(search=text)
 
     def main_shadow(self, w, type=''):
         """
@@ -569,6 +1195,52 @@ class ZfsGui (object):
         window_title = ' '.join([pool_name, 'properties'])
         self._popup_target.open_box(self.popup_layout(), window_title)
 
+    def btn_space_dataset(self, button, name):
+        """
+        Opens space breakdown of pool/dataset. Pool tree is reloaded each time the pool itself is opened.
+        """
+        pool = name.split('/', 1)[0]
+        tree = self.space_trees.setdefault(pool, ZfsSpaceTree(pool))
+        load_msg = None
+        if name == pool or not tree.nodes:
+            changed = tree.load(self.mothership_core.list_space(pool))
+            load_msg = u"Space of {} loaded, {} datasets recomputed".format(pool, len(changed))
+            self.log_it(load_msg)
+        w = self.panel_render(False, self.model.space_list(tree, name), 'space')
+        if load_msg:
+            self.handle['space'].append(urwid.Text(load_msg))
+        self._popup_target.open_box(w, ' '.join([name, 'space usage']))
+
+    def btn_snapshots(self, button, name):
+        self.snap_range = None
+        w = self.panel_render(False, self.model.snapshot_list(name, self.mothership_core.list_snapshots(name)), 'snaps')
+        self._popup_target.open_box(w, ' '.join([name, 'snapshots']))
+
+    def btn_snap_reclaim(self, button, data):
+        """
+        First press marks start of snapshot range, second one estimates space reclaimed by destroying range
+        :data: tuple(dataset, snapshot, index)
+        """
+        if not self.snap_range:
+            self.snap_range = {'data': data, 'button': button, 'label': button.get_label()}
+            button.set_label(self.snap_range['label'] + '  <- range start')
+            return
+
+        start = self.snap_range
+        self.snap_range = None
+        start['button'].set_label(start['label'])
+        dataset = data[0]
+        first, last = sorted([start['data'], data], key=lambda x: x[2])
+        reclaim = self.mothership_core.snapshot_reclaim(dataset, first[1], last[1])
+        if reclaim is None:
+            result = u"{}@{}%{}: zfs did not report reclaimable space".format(dataset, first[1], last[1])
+            self.log_it(result, 'warn')
+        else:
+            result = u"{}@{}%{}: {} reclaimable".format(dataset, first[1], last[1], self.model.human_size(reclaim))
+            self.log_it(result)
+        # Show result right under pressed button, log panel is covered by popup
+        self.handle['snaps'].insert(self.handle['snaps'].get_focus()[1] + 1, urwid.Text('  ' + result))
+
     def btn_create_zfs(self, w):
         self.log_it(u"Create zfs filesystem")
         window_title = 'Create new ZFS filesystem.'
@@ -619,10 +1291,15 @@ class ZfsGui (object):
         This creates log window. Also adds bottom captions.
         :return: urwid.[widget]
         """
-        log_head = urwid.AttrMap(urwid.Text(u'Log'), 'header', 'fheader')   # Header
-        log_foot = urwid.AttrMap(urwid.Text(u'F5 - force refresh data | q - exit', align='right'), 'header')
-        self.log_box = urwid.SimpleFocusListWalker(self.log)                # Window content
-        w = urwid.ListBox(self.log_box)
+        self.log_title = urwid.Text(u'Log [{}+]'.format(self.log.min_level))
+        log_head = urwid.AttrMap(self.log_title, 'header', 'fheader')       # Header
+        log_foot = urwid.AttrMap(urwid.Text(u'F5 - force refresh data | F6 - log level | q - exit', align='right'), 'header')
+        log_search = urwid.Edit(u'Search: ')
+        urwid.connect_signal(log_search, 'change', self.log_search)
+        w = urwid.Pile([                                                    # Window content
+            ('pack', urwid.AttrMap(log_search, 'reverse')),
+            urwid.ListBox(self.log)
+        ])
         w = urwid.Frame(w, header=log_head, footer=log_foot )               # BoxWidget
         return w
 
@@ -704,9 +1381,14 @@ class ZfsGui (object):
         self._bottom_frame_with_shadow = self.main_frame()
         self._popup_target = CascadingBoxes(self._bottom_frame_with_shadow)
         self._loop = urwid.MainLoop(self._popup_target, self.palette, unhandled_input=self.grab_input)
+        self._sample_pipe = self._loop.watch_pipe(self.sample_done)
+        self.sample_usage()
         self.frame_refresh(self.model.disk_list(self.mothership_core.list_disks()), 'dlist')
         self.frame_refresh(self.model.zfs_pools(self.mothership_core.list_zpools()), 'zlist')
-        self._loop.run()
+        try:
+            self._loop.run()
+        finally:
+            self.log_writer.close()
 
 
 if __name__ == '__main__':